@@ -0,0 +1,217 @@
+import base64
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import generate_report as gr
+
+
+# --- alias / val batch classification ---------------------------------------------------------
+
+@pytest.mark.parametrize(
+    "name, metric",
+    [
+        ("pr_curve.png", "PR"),
+        ("BoxPR_curve.png", "PR"),
+        ("box-f1_curve.jpg", "F1"),
+        ("confusion_matrix.png", "CM"),
+        ("confusion_matrix_normalized.png", "CM_N"),
+        ("cm_norm.svg", "CM_N"),
+    ],
+)
+def test_alias_lookup_maps_names_to_metrics(name, metric):
+    assert gr.ALIAS_LOOKUP[name.lower()][0] == metric
+
+
+def test_alias_lookup_ranks_follow_alias_then_extension_order():
+    assert gr.ALIAS_LOOKUP["pr_curve.png"][2] < gr.ALIAS_LOOKUP["pr_curve.jpg"][2]
+    assert gr.ALIAS_LOOKUP["pr_curve.jpg"][2] < gr.ALIAS_LOOKUP["pr-curve.png"][2]
+    assert "pr_curve.gif" not in gr.ALIAS_LOOKUP
+
+
+@pytest.mark.parametrize(
+    "name, n, kind",
+    [
+        ("val_batch0_labels.jpg", "0", "labels"),
+        ("val_batch12_pred.png", "12", "pred"),
+        ("val_batch_labels.jpg", None, "labels"),
+    ],
+)
+def test_val_re(name, n, kind):
+    m = gr._VAL_RE.match(name)
+    assert m is not None
+    assert m.group("n", "kind") == (n, kind)
+
+
+def test_val_re_rejects_other_images():
+    assert gr._VAL_RE.match("train_batch0.jpg") is None
+    assert gr._VAL_RE.match("val_batch0.jpg") is None
+
+
+def _touch(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_collect_config_images_picks_best_alias_and_groups_batches(tmp_path):
+    cfg = tmp_path / "a_config"
+    _touch(cfg / "PR_curve.jpg", b"jpg")
+    _touch(cfg / "pr-curve.png", b"lower-priority")
+    _touch(cfg / "confusion_matrix.png", b"cm")
+    _touch(cfg / "val_batch0_labels.jpg", b"l0")
+    _touch(cfg / "val_batch1_pred.jpg", b"p1")
+    _touch(cfg / "results.csv", b"skip")
+    (configs,) = gr.collect_config_images(tmp_path)
+    images = configs.images
+    jpg_url = "data:image/jpeg;base64," + base64.b64encode(b"jpg").decode()
+    assert images["pr_curve.png"] == jpg_url
+    assert images["pr_curve.jpg"] == jpg_url
+    # Normalized confusion matrix falls back to the raw one
+    assert images["confusion_matrix_normalized.png"] == images["confusion_matrix.png"]
+    assert images["f1_curve.png"] is None
+    assert list(images["VAL_LABELS"]) == ["batch_0"]
+    assert list(images["VAL_PRED"]) == ["batch_1"]
+
+
+def test_discover_runs_finds_root_and_child_runs(tmp_path):
+    _touch(tmp_path / "x_config" / "pr_curve.png")
+    _touch(tmp_path / "run2" / "y_config" / "pr_curve.png")
+    (tmp_path / "not_a_run").mkdir()
+    runs = gr.discover_runs(tmp_path)
+    assert sorted(r.run_name for r in runs) == sorted([tmp_path.name, "run2"])
+
+
+# --- encoding ----------------------------------------------------------------------------------
+
+@pytest.mark.parametrize(
+    "size",
+    [0, 1, 2, 3, gr.B64_CHUNK_SIZE - 1, gr.B64_CHUNK_SIZE, gr.B64_CHUNK_SIZE + 1, 3 * gr.B64_CHUNK_SIZE + 7],
+)
+def test_encode_stream_matches_b64encode(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "img.png"
+    path.write_bytes(data)
+    expected = "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+    assert gr.encode_stream(str(path), "image/png") == expected
+
+
+def test_encode_cache_reads_duplicates_once(tmp_path, monkeypatch):
+    _touch(tmp_path / "a.png", b"a" * 1000)
+    _touch(tmp_path / "b.png", b"a" * 1000)
+    calls = []
+    real = gr.encode_stream
+
+    def counting(path, mime):
+        calls.append(path)
+        return real(path, mime)
+
+    monkeypatch.setattr(gr, "encode_stream", counting)
+    cache = gr.EncodeCache()
+    entries = sorted(os.scandir(tmp_path), key=lambda e: e.name) * 8
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        urls = list(pool.map(lambda e: gr.encode_image_to_data_url(e, cache), entries))
+    # Two distinct files (same content, different identity), each read once
+    assert sorted(calls) == sorted(str(tmp_path / n) for n in ("a.png", "b.png"))
+    assert len(set(urls)) == 1
+    assert not cache.pending
+
+
+def test_encode_missing_file_returns_none(tmp_path):
+    _touch(tmp_path / "gone.png")
+    (entry,) = list(os.scandir(tmp_path))
+    os.remove(entry.path)
+    assert gr.encode_image_to_data_url(entry, gr.EncodeCache()) is None
+    assert gr.encode_image_to_data_url(entry) is None
+
+
+# --- CLI ---------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        [],
+        ["--root", "/r"],
+        ["--root=/r", "--output", "o.html", "--title", "A title"],
+        ["--title=--dashes", "--external-js"],
+        ["--external-js", "--output=x.html"],
+    ],
+)
+def test_parse_args_fast_path_matches_argparse(argv):
+    assert vars(gr.parse_args(argv)) == vars(gr._parse_args_full(argv))
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["--external_js"], ["--bogus"], ["--title"], ["--title", "-x"], ["--external-js=1"], ["--help"]],
+)
+def test_parse_args_defers_unknown_forms_to_argparse(argv, capsys):
+    with pytest.raises(SystemExit):
+        gr._parse_args_full(argv)
+    with pytest.raises(SystemExit):
+        gr.parse_args(argv)
+
+
+# --- emitted scripts ---------------------------------------------------------------------------
+
+def test_minify_js_strips_layout_and_whole_line_comments():
+    src = "\n    // comment\n    const a = 1; // kept\n\n      const url = 'http://x';\n"
+    assert gr._minify_js(src) == "const a = 1; // kept\nconst url = 'http://x';"
+
+
+def test_alias_meta_round_trips():
+    payload = gr._ALIAS_META_JS
+    assert payload.startswith("window.__aliasMeta=") and payload.endswith(";")
+    meta = json.loads(payload[len("window.__aliasMeta="):-1])
+    assert meta["exts"] == gr.ALLOWED_EXTS
+    assert meta["boxPrefixes"] == list(gr.BOX_PREFIXES)
+    assert meta["canonical"]["CM_N"] == "confusion_matrix_normalized.png"
+
+
+def test_report_is_complete_html():
+    html = gr.generate_html_multi_str([], "T <&>")
+    assert html.startswith("<!DOCTYPE html>")
+    assert "<h1>T &lt;&amp;&gt;</h1>" in html
+    assert html.endswith("</body>\n</html>\n")
+
+
+_SCANNER_CHECK = r"""
+const OLD = /(?<![\w.\/-])([\w.\/-]{0,256}?(ultralytics|torch)\/[\w.\/-]+\.py):(\d+)/gi;
+const samples = %s;
+const out = samples.map(s => {
+  const norm = s.replace(/\\/g, '/');
+  const esc = escapeHtml(norm);
+  const expected = esc.replace(OLD, (m, src, root, line) =>
+    `<span class="src-ref" data-ref="${pyRefTarget(src, line)}">${m}</span>`);
+  return [buildLinkifiedHTML(s), expected];
+});
+console.log(JSON.stringify(out));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not available")
+def test_source_ref_scanner_matches_reference_regex(tmp_path):
+    samples = [
+        "C:\\site-packages\\ultralytics\\engine\\validator.py:123 x",
+        'File "/usr/lib/torch/nn/modules/module.py", line 5 torch/nn/functional.py:77',
+        "a/torch/x.py:12/torch/y.py:3 ULTRALYTICS/A.PY:9",
+        "torch/.py:3 torch/a.py: " + "a/" * 200 + "torch/b.py:1",
+        "<b>&ultralytics/x.py:1</b>",
+        "no refs here",
+    ]
+    script = tmp_path / "check.js"
+    script.write_text(gr._JS2_MIN + "\n" + _SCANNER_CHECK % json.dumps(samples), encoding="utf-8")
+    stub = (
+        "globalThis.document={getElementById:()=>null,createElement:()=>({style:{}}),querySelector:()=>null};"
+        "globalThis.window=globalThis;globalThis.requestAnimationFrame=f=>setTimeout(f,0);"
+    )
+    res = subprocess.run(
+        ["node", "-e", stub + "require('vm').runInThisContext(require('fs').readFileSync(process.argv[1],'utf8'))", str(script)],
+        capture_output=True, text=True, check=True,
+    )
+    for got, expected in json.loads(res.stdout):
+        assert got == expected